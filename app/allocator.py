@@ -0,0 +1,111 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable
+from app.user_agent import UserAgent
+
+logger = logging.getLogger(__name__)
+
+# 單次加選嘗試的結果
+WON = "won"              # 加選成功
+LOST = "lost"            # 暫時性失敗（登入失敗、驗證碼錯誤等），換下一位
+SKIPPED = "skipped"      # 此帳號無法加選（衝堂、已加選等），換下一位
+FULL = "full"            # 名額已被搶走，停止此課程
+ABORTED = "aborted"      # 上游異常（斷路器開啟），停止此課程
+CANCELLED = "cancelled"  # 名額已滿，被中途取消
+
+
+class _CourseState:
+    def __init__(self, course_id: str, seats: int, candidates: list[UserAgent]):
+        self.course_id = course_id
+        self.seats = seats
+        self.queue = deque(candidates)
+        self.in_flight = 0
+        self.won = 0
+        self.closed = False
+        # 名額用完時通知仍在進行中的嘗試提早結束
+        self.cancel = threading.Event()
+
+    def close(self):
+        self.closed = True
+        self.cancel.set()
+
+
+class EnrollmentAllocator:
+    # 依剩餘名額分配加選嘗試：每門課最多同時 seats + extra_attempts 個帳號，
+    # 依 priority 排序，名額用完即取消其餘嘗試，失敗時遞補下一位
+    # attempt 回傳 (結果, 後續動作)；後續動作（通知、移除設定）在判定名額並取消其餘嘗試後才執行
+    def __init__(
+        self,
+        attempt: Callable[[UserAgent, str, threading.Event], tuple[str, Callable[[], None] | None]],
+        extra_attempts: int = 1,
+        max_workers: int = 8,
+    ):
+        self.attempt = attempt
+        self.extra_attempts = extra_attempts
+        self.max_workers = max_workers
+
+    def run(self, seats: dict[str, int], user_agents: list[UserAgent]) -> dict[str, int]:
+        states = {}
+        for course_id, free in seats.items():
+            # priority 大者優先，相同時依 users.json 順序
+            candidates = sorted(
+                (ua for ua in user_agents if course_id in ua.courses),
+                key=lambda ua: -ua.priority,
+            )
+            if candidates and free > 0:
+                states[course_id] = _CourseState(course_id, free, candidates)
+
+        if not states:
+            return {}
+
+        pending = {}
+        # 後續動作另開執行緒，慢的 Discord 通知不會佔用加選的並行數
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="followup") as followups:
+            def dispatch(state: _CourseState):
+                limit = state.seats - state.won + self.extra_attempts
+                while not state.closed and state.queue and state.in_flight < limit:
+                    ua = state.queue.popleft()
+                    state.in_flight += 1
+                    logger.info(f"[{ua.account}] 分配加選 {state.course_id}（名額 {state.seats - state.won}，進行中 {state.in_flight}）")
+                    future = executor.submit(self.attempt, ua, state.course_id, state.cancel)
+                    pending[future] = (state, ua)
+
+            for state in states.values():
+                dispatch(state)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    state, ua = pending.pop(future)
+                    state.in_flight -= 1
+                    try:
+                        outcome, followup = future.result()
+                    except Exception as e:
+                        logger.error(f"[{ua.account}] {state.course_id} 加選嘗試發生錯誤: {e}")
+                        outcome, followup = LOST, None
+
+                    if outcome == WON:
+                        state.won += 1
+                        if state.won >= state.seats:
+                            logger.info(f"{state.course_id} 名額已分配完畢，取消其餘 {state.in_flight} 個嘗試")
+                            state.close()
+                    elif outcome in (FULL, ABORTED):
+                        if not state.closed:
+                            logger.info(f"{state.course_id} 停止分配（{outcome}），取消其餘 {state.in_flight} 個嘗試")
+                        state.close()
+
+                    dispatch(state)
+                    if followup is not None:
+                        followups.submit(self._run_followup, followup, ua, state.course_id)
+
+        return {course_id: state.won for course_id, state in states.items()}
+
+    @staticmethod
+    def _run_followup(followup: Callable[[], None], ua: UserAgent, course_id: str):
+        try:
+            followup()
+        except Exception as e:
+            logger.error(f"[{ua.account}] {course_id} 後續處理發生錯誤: {e}")
@@ -1,22 +1,16 @@
-import requests
-import urllib3
+from app.circuit_breaker import guarded_request
+from app.transport import create_session
 
 class SessionManager:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-        })
-        # 針對不正常證書的目標伺服器禁用 SSL 警告
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        self.session.verify = False
+        # 獨立 Cookie，共用 transport 的連線池與標頭設定
+        self.session = create_session()
 
     def get(self, url, **kwargs):
-        return self.session.get(url, **kwargs)
+        return guarded_request(self.session.request, "GET", url, **kwargs)
 
     def post(self, url, **kwargs):
-        return self.session.post(url, **kwargs)
+        return guarded_request(self.session.request, "POST", url, **kwargs)
 
     def clear_cookies(self):
         self.session.cookies.clear()
@@ -0,0 +1,125 @@
+import argparse
+import base64
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+logger = logging.getLogger(__name__)
+
+# 比較各驗證碼後端的冷啟動時間、常駐記憶體與單張辨識延遲
+# 每個後端在獨立子行程中執行，RSS 才不會互相影響：
+#   uv run --extra easyocr --extra onnx python -m app.captcha_benchmark --samples 50
+
+
+def fetch_samples(count: int, path: str):
+    from app.api_client import SessionManager
+    from app.login_manager import LoginManager
+
+    session = SessionManager()
+    samples = []
+    for _ in range(count):
+        resp = session.get(LoginManager.CAPTCHA_URL, timeout=5)
+        resp.raise_for_status()
+        samples.append(resp.text.strip().strip('"'))
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(samples, f)
+    logger.info(f"已下載 {len(samples)} 張驗證碼至 {path}")
+
+
+def export_corpus_samples(count: int, path: str):
+    # 以樣本庫中已驗證的驗證碼作為樣本，附上正確答案以計算準確率
+    from app.captcha_corpus import corpus
+
+    if corpus is None:
+        raise SystemExit("CAPTCHA_CORPUS_PATH is not set")
+    rows = corpus.samples(verified=True)[-count:]
+    samples = [{"image": base64.b64encode(image).decode("ascii"), "label": label} for image, label in rows]
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(samples, f)
+    logger.info(f"已從樣本庫匯出 {len(samples)} 張已驗證的驗證碼至 {path}")
+
+
+def run_worker(backend: str, samples_path: str) -> dict:
+    with open(samples_path, encoding="utf-8") as f:
+        samples = json.load(f)
+
+    t0 = time.perf_counter()
+    from app.captcha_solver import create_captcha_solver
+    solver = create_captcha_solver(backend)
+    cold_start = time.perf_counter() - t0
+
+    latencies = []
+    answers = []
+    labels = []
+    for sample in samples:
+        # 下載的樣本只有圖片；樣本庫匯出的附有正確答案
+        b64 = sample["image"] if isinstance(sample, dict) else sample
+        labels.append(sample["label"] if isinstance(sample, dict) else None)
+        t1 = time.perf_counter()
+        answers.append(solver.solve_base64(b64))
+        latencies.append(time.perf_counter() - t1)
+
+    ordered = sorted(latencies)
+    return {
+        "backend": backend,
+        "cold_start_s": round(cold_start, 3),
+        # Linux 的 ru_maxrss 單位為 KiB
+        "max_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "latency_p50_ms": round(ordered[len(ordered) // 2] * 1000, 2) if ordered else 0.0,
+        "latency_p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2) if ordered else 0.0,
+        "readable": sum(1 for a in answers if len(a) == 4),
+        "correct": sum(1 for a, label in zip(answers, labels) if a == label) if all(labels) else None,
+        "answers": answers,
+    }
+
+
+def compare(backends: list[str], samples_path: str) -> list[dict]:
+    results = []
+    for backend in backends:
+        proc = subprocess.run(
+            [sys.executable, "-m", "app.captcha_benchmark", "--worker", backend, "--samples-file", samples_path],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            logger.error(f"[{backend}] benchmark failed:\n{proc.stderr.strip()}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    total = len(results[0]["answers"]) if results else 0
+    print(f"{'backend':<10}{'cold start':>12}{'max RSS':>12}{'p50':>10}{'p95':>10}{'4 chars':>10}{'correct':>10}")
+    for r in results:
+        correct = f"{r['correct']}/{total}" if r.get("correct") is not None else "-"
+        print(f"{r['backend']:<10}{r['cold_start_s']:>11.2f}s{r['max_rss_mib']:>8.1f} MiB"
+              f"{r['latency_p50_ms']:>8.1f}ms{r['latency_p95_ms']:>8.1f}ms{r['readable']:>6}/{total}{correct:>10}")
+
+    if len(results) == 2 and total:
+        agree = sum(1 for a, b in zip(results[0]["answers"], results[1]["answers"]) if a == b)
+        print(f"兩後端結果一致：{agree}/{total}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare captcha solver backends")
+    parser.add_argument("--backends", default="easyocr,onnx")
+    parser.add_argument("--samples", type=int, default=0, help="先從 SSO 下載指定張數的驗證碼")
+    parser.add_argument("--from-corpus", type=int, default=0, help="改用樣本庫中最近的已驗證驗證碼（可計算準確率）")
+    parser.add_argument("--samples-file", default="captcha_samples.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.samples_file), ensure_ascii=False))
+        raise SystemExit(0)
+
+    if args.from_corpus:
+        export_corpus_samples(args.from_corpus, args.samples_file)
+    elif args.samples or not os.path.exists(args.samples_file):
+        fetch_samples(args.samples or 50, args.samples_file)
+    compare(args.backends.split(","), args.samples_file)
@@ -0,0 +1,239 @@
+import argparse
+import base64
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# 設定路徑才會啟用收集（例如 data/captcha_corpus.sqlite3）
+CAPTCHA_CORPUS_PATH = os.getenv("CAPTCHA_CORPUS_PATH", "")
+CAPTCHA_CORPUS_MAX_MB = float(os.getenv("CAPTCHA_CORPUS_MAX_MB", "50"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    hash TEXT PRIMARY KEY,
+    image BLOB NOT NULL,
+    label TEXT NOT NULL,
+    verified INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class CaptchaCorpus:
+    # 以 SQLite 儲存驗證碼圖片與標註：同一張圖只存一次，總大小超過上限時先淘汰最舊的錯誤樣本
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+            # 總大小只在啟動時計算一次，之後隨新增與淘汰更新，避免每次寫入都掃描整張表
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(LENGTH(image)), 0) FROM samples").fetchone()[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def add(self, image: bytes, label: str, verified: bool, source: str) -> bool:
+        digest = hashlib.sha1(image).hexdigest()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT verified FROM samples WHERE hash = ?", (digest,)).fetchone()
+            # 已驗證的標註不會被覆蓋；錯誤樣本可升級為已驗證
+            if row and (row[0] or not verified):
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO samples (hash, image, label, verified, source, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, image, label, int(verified), source, time.time()),
+            )
+            # 取代的是同一張圖，大小不變
+            if not row:
+                self._total_bytes += len(image)
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+        return True
+
+    def _evict(self, conn: sqlite3.Connection):
+        rows = conn.execute("SELECT hash, LENGTH(image) FROM samples ORDER BY verified ASC, created_at ASC").fetchall()
+        removed = []
+        for digest, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            removed.append((digest,))
+            self._total_bytes -= size
+        conn.executemany("DELETE FROM samples WHERE hash = ?", removed)
+
+    def samples(self, verified: bool = True) -> list[tuple[bytes, str]]:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT image, label FROM samples WHERE verified = ? ORDER BY created_at", (int(verified),)
+            ).fetchall()
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT source, verified, COUNT(*), COALESCE(SUM(LENGTH(image)), 0) FROM samples GROUP BY source, verified"
+            ).fetchall()
+        return {
+            "total": sum(r[2] for r in rows),
+            "bytes": sum(r[3] for r in rows),
+            "by_source": {f"{source}/{'verified' if verified else 'wrong'}": count for source, verified, count, _ in rows},
+        }
+
+
+corpus: CaptchaCorpus | None = None
+if CAPTCHA_CORPUS_PATH:
+    corpus = CaptchaCorpus(CAPTCHA_CORPUS_PATH, int(CAPTCHA_CORPUS_MAX_MB * 1024 * 1024))
+
+
+def record(base64_str: str | None, label: str | None, verified: bool, source: str):
+    # 未啟用或資料不完整時直接略過；收集失敗不影響登入與加選
+    if corpus is None or not base64_str or not label:
+        return
+    try:
+        if "," in base64_str:
+            base64_str = base64_str.split(",")[1]
+        if corpus.add(base64.b64decode(base64_str), label, verified, source):
+            logger.debug(f"Captcha corpus: stored '{label}' ({'verified' if verified else 'wrong'}, {source})")
+    except Exception as e:
+        logger.warning(f"Failed to store captcha sample: {e}")
+
+
+def _decode_samples(rows: list[tuple[bytes, str]], charset: str) -> list:
+    import cv2
+    import numpy as np
+    from app.captcha_solver import preprocess_for_recognizer
+
+    data = []
+    for image, label in rows:
+        img = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+        if img is not None and all(c in charset for c in label):
+            data.append((preprocess_for_recognizer(img), label))
+    return data
+
+
+def _predict(model, charset: str, images) -> list[str]:
+    import torch
+    from app.captcha_solver import ctc_greedy_decode
+
+    model.eval()
+    predictions = []
+    with torch.no_grad():
+        for img in images:
+            logits = model(torch.from_numpy(img).unsqueeze(0), None)[0]
+            predictions.append(ctc_greedy_decode(logits.argmax(dim=-1).tolist(), charset))
+    return predictions
+
+
+def train(output_path: str, epochs: int, batch_size: int, lr: float, holdout: float, freeze_backbone: bool):
+    # 以已驗證的樣本微調 EasyOCR 辨識模型，再匯出為 ONNX 後端使用的 int8 模型
+    import easyocr
+    import numpy as np
+    import torch
+    from app.onnx_export import export_model
+
+    if corpus is None:
+        raise SystemExit("CAPTCHA_CORPUS_PATH is not set")
+
+    # 預設會動態量化辨識模型，量化後的 LSTM 無法訓練與匯出，改載入原始 fp32 權重
+    reader = easyocr.Reader(['en'], gpu=False, verbose=False, quantize=False)
+    model = reader.recognizer
+    charset = reader.character
+
+    data = _decode_samples(corpus.samples(verified=True), charset)
+    if len(data) < 10:
+        raise SystemExit(f"Only {len(data)} usable verified samples, need at least 10")
+
+    random.Random(0).shuffle(data)
+    split = max(1, int(len(data) * holdout))
+    test, train_set = data[:split], data[split:]
+
+    def accuracy(subset) -> float:
+        predictions = _predict(model, charset, [img for img, _ in subset])
+        return sum(p == label for p, (_, label) in zip(predictions, subset)) / len(subset)
+
+    before = accuracy(test)
+    logger.info(f"Training on {len(train_set)} samples, {len(test)} held out (accuracy before: {before:.1%})")
+
+    if freeze_backbone:
+        # 樣本少時只調整序列與輸出層，避免過擬合
+        for param in model.FeatureExtraction.parameters():
+            param.requires_grad = False
+
+    optimizer = torch.optim.Adam((p for p in model.parameters() if p.requires_grad), lr=lr)
+    ctc_loss = torch.nn.CTCLoss(blank=0, zero_infinity=True)
+
+    for epoch in range(epochs):
+        model.train()
+        if freeze_backbone:
+            # 凍結的骨幹維持推論模式，否則 BatchNorm 的統計值仍會被小批次樣本改寫
+            model.FeatureExtraction.eval()
+        random.shuffle(train_set)
+        total_loss = 0.0
+        for i in range(0, len(train_set), batch_size):
+            batch = train_set[i:i + batch_size]
+            # 寬度不同時以最後一欄補齊，與 EasyOCR 的 NormalizePAD 相同
+            width = max(img.shape[2] for img, _ in batch)
+            images = torch.from_numpy(np.stack([
+                np.pad(img, ((0, 0), (0, 0), (0, width - img.shape[2])), mode="edge") for img, _ in batch
+            ]))
+            targets = torch.tensor([charset.index(c) + 1 for _, label in batch for c in label])
+            target_lengths = torch.tensor([len(label) for _, label in batch])
+
+            log_probs = model(images, None).log_softmax(2).permute(1, 0, 2)
+            input_lengths = torch.full((len(batch),), log_probs.size(0), dtype=torch.long)
+            loss = ctc_loss(log_probs, targets, input_lengths, target_lengths)
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(batch)
+        logger.info(f"Epoch {epoch + 1}/{epochs}: loss {total_loss / len(train_set):.4f}")
+
+    after = accuracy(test)
+    logger.info(f"Held-out accuracy: {before:.1%} -> {after:.1%}")
+
+    # 錯誤樣本：新模型仍給出已知錯誤答案的比例
+    negatives = _decode_samples(corpus.samples(verified=False), charset)
+    if negatives:
+        predictions = _predict(model, charset, [img for img, _ in negatives])
+        repeated = sum(p == label for p, (_, label) in zip(predictions, negatives))
+        logger.info(f"Known-wrong answers repeated: {repeated}/{len(negatives)}")
+
+    if after < before:
+        logger.warning("Held-out accuracy dropped, model not exported")
+        return
+
+    export_model(model, charset, output_path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Captcha corpus collected from verified logins and enrollments")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="顯示樣本數量與大小")
+    train_parser = sub.add_parser("train", help="以已驗證樣本微調辨識模型並匯出 ONNX")
+    train_parser.add_argument("--output", default=os.getenv("ONNX_MODEL_PATH", "models/captcha_int8.onnx"))
+    train_parser.add_argument("--epochs", type=int, default=10)
+    train_parser.add_argument("--batch-size", type=int, default=32)
+    train_parser.add_argument("--lr", type=float, default=1e-4)
+    train_parser.add_argument("--holdout", type=float, default=0.1)
+    train_parser.add_argument("--no-freeze-backbone", dest="freeze_backbone", action="store_false")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        if corpus is None:
+            raise SystemExit("CAPTCHA_CORPUS_PATH is not set")
+        print(corpus.stats())
+    else:
+        train(args.output, args.epochs, args.batch_size, args.lr, args.holdout, args.freeze_backbone)
@@ -1,35 +1,110 @@
 import base64
+import logging
+import os
 import numpy as np
 import cv2
-import easyocr
 import warnings
 
 warnings.filterwarnings("ignore", message="'pin_memory' argument is set as true")
 
+logger = logging.getLogger(__name__)
+
+# easyocr: 原本的 EasyOCR（需 torch）；onnx: 量化後的 ONNX 辨識模型（不需 torch）
+CAPTCHA_BACKEND = os.getenv("CAPTCHA_BACKEND", "easyocr")
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "models/captcha_int8.onnx")
+
+
+# EasyOCR 辨識模型的輸入高度
+RECOGNIZER_HEIGHT = 64
+
+
+def decode_base64_image(base64_str: str) -> np.ndarray | None:
+    # 支援 data:image/...;base64, 前綴
+    if "," in base64_str:
+        base64_str = base64_str.split(",")[1]
+    nparr = np.frombuffer(base64.b64decode(base64_str), np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def preprocess_for_recognizer(img: np.ndarray) -> np.ndarray:
+    # 與 EasyOCR 相同的前處理：灰階、等比例縮放至高 64、正規化到 [-1, 1]，回傳 (1, H, W)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    h, w = gray.shape
+    width = max(1, round(w * RECOGNIZER_HEIGHT / h))
+    resized = cv2.resize(gray, (width, RECOGNIZER_HEIGHT), interpolation=cv2.INTER_CUBIC)
+    return ((resized.astype(np.float32) / 255.0 - 0.5) / 0.5)[np.newaxis, :, :]
+
+
+def ctc_greedy_decode(indices, charset: str) -> str:
+    # 合併連續重複並移除 blank（index 0）
+    chars = []
+    previous = 0
+    for idx in indices:
+        idx = int(idx)
+        if idx != previous and idx != 0:
+            chars.append(charset[idx - 1])
+        previous = idx
+    return ''.join(chars)
+
+
 class CaptchaSolver:
     def __init__(self):
+        # 延遲載入，未安裝 torch 的映像檔仍可使用 ONNX 後端
+        import easyocr
+
         # CAPTCHA 只需要英文與數字
         # verbose=False 隱藏 EasyOCR 啟動日誌
         self.reader = easyocr.Reader(['en'], verbose=False)
 
     def solve_base64(self, base64_str: str) -> str:
-        # 接收 base64 編碼的圖片字串，解碼後使用 EasyOCR 辨識。
-        if "," in base64_str:
-            base64_str = base64_str.split(",")[1]
-
-        img_bytes = base64.b64decode(base64_str)
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        results = self.reader.readtext(img)
+        # 接收 base64 編碼的圖片字串，解碼後辨識。
+        img = decode_base64_image(base64_str)
 
         # 串接所有片段中的英數字元
-        all_chars = ''.join(
-            c for (_, text, _) in results
-            for c in text if c.isalnum()
-        )
+        all_chars = ''.join(c for c in self._read_text(img) if c.isalnum())
 
         # 回傳前 4 碼（驗證碼固定為 4 碼）
         if len(all_chars) >= 4:
             return all_chars[:4]
         return ""
+
+    def _read_text(self, img: np.ndarray) -> str:
+        results = self.reader.readtext(img)
+        return ''.join(text for (_, text, _) in results)
+
+
+class OnnxCaptchaSolver(CaptchaSolver):
+    # EasyOCR 辨識模型（CRNN）匯出並 int8 量化後的版本，見 app/onnx_export.py
+    # 驗證碼只有一行字，略過文字偵測，直接把整張圖送進辨識模型
+    def __init__(self, model_path: str = ONNX_MODEL_PATH):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        # 驗證碼很小，單執行緒即可，避免和抓取執行緒搶 CPU
+        options.intra_op_num_threads = int(os.getenv("ONNX_THREADS", "1"))
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        # 字元表存在模型 metadata，index 0 為 CTC blank
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "charset" not in metadata:
+            raise ValueError(f"{model_path} has no 'charset' metadata; re-export it with app.onnx_export")
+        self.charset = metadata["charset"]
+
+    def _read_text(self, img: np.ndarray) -> str:
+        if img is None:
+            return ""
+
+        tensor = preprocess_for_recognizer(img)[np.newaxis, :, :, :]
+        logits = self.session.run(None, {self.input_name: tensor})[0][0]
+        return ctc_greedy_decode(logits.argmax(axis=-1), self.charset)
+
+
+def create_captcha_solver(backend: str = CAPTCHA_BACKEND) -> CaptchaSolver:
+    if backend == "onnx":
+        logger.info(f"Captcha backend: ONNX ({ONNX_MODEL_PATH})")
+        return OnnxCaptchaSolver()
+    if backend == "easyocr":
+        return CaptchaSolver()
+    raise ValueError(f"Unknown CAPTCHA_BACKEND: {backend}")
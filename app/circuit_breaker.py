@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 學校各系統的路徑前綴 -> 斷路器名稱
+ENDPOINTS = {
+    "/WebNewCAS/": "QueryCour",
+    "/YunTechSSO/": "SSO",
+    "/AAXCCS/": "AAXCCS",
+}
+
+# 5xx 代表上游異常，計入失敗
+_SERVER_ERROR = 500
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} 斷路器開啟中，{retry_in:.0f}s 後再試")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        open_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+
+        # 最近 window 次呼叫的 (是否失敗, 耗時)
+        self._calls: deque[tuple[bool, float]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        # 每次狀態轉換加一；結果只計入發出時同一代的請求，開啟前送出的舊請求不影響新狀態
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def is_rejecting(self) -> bool:
+        # 開啟中且尚未到半開時間，或半開探測已在進行 -> 呼叫會被立即拒絕
+        with self._lock:
+            if self._state == OPEN:
+                return time.monotonic() - self._opened_at < self.open_seconds
+            return self._state == HALF_OPEN and self._probe_in_flight
+
+    def allow_request(self) -> int:
+        # 回傳此請求的 generation，完成後交給 record()
+        with self._lock:
+            if self._state == CLOSED:
+                return self._generation
+
+            if self._state == OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                if elapsed < self.open_seconds:
+                    raise CircuitOpenError(self.name, self.open_seconds - elapsed)
+                self._transition(HALF_OPEN)
+
+            # 半開：只放行一個探測請求
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.name, 0)
+            self._probe_in_flight = True
+            return self._generation
+
+    def record(self, generation: int, failed: bool, latency: float):
+        failed = failed or latency >= self.slow_call_seconds
+
+        with self._lock:
+            if generation != self._generation:
+                # 狀態轉換前送出的請求，結果不影響目前狀態
+                return
+
+            if self._state == HALF_OPEN:
+                # 半開時同一代只放行了一個探測請求，能走到這裡的就是它
+                self._probe_in_flight = False
+                if failed:
+                    self._open()
+                else:
+                    # 探測成功立即恢復全速輪詢
+                    self._calls.clear()
+                    self._transition(CLOSED)
+                return
+
+            self._calls.append((failed, latency))
+            if len(self._calls) >= self.min_calls and self._error_rate() >= self.failure_rate:
+                self._open()
+
+    def call(self, func, *args, **kwargs):
+        generation = self.allow_request()
+        t0 = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            self.record(generation, True, time.monotonic() - t0)
+            raise
+
+        status = getattr(result, "status_code", 0)
+        self.record(generation, status >= _SERVER_ERROR, time.monotonic() - t0)
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(latency for _, latency in self._calls)
+            p50 = latencies[len(latencies) // 2] if latencies else 0.0
+            return {
+                "state": self._state,
+                "calls": len(self._calls),
+                "error_rate": round(self._error_rate(), 3),
+                "latency_p50": round(p50, 3),
+                "latency_max": round(latencies[-1], 3) if latencies else 0.0,
+            }
+
+    def _error_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for failed, _ in self._calls if failed) / len(self._calls)
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, new_state: str):
+        if new_state == self._state:
+            return
+        old_state, self._state = self._state, new_state
+        self._generation += 1
+        if new_state == OPEN:
+            logger.warning(f"⚠️ [{self.name}] 斷路器開啟（{old_state} -> {new_state}），{self.open_seconds:.0f}s 內直接失敗")
+        elif new_state == HALF_OPEN:
+            logger.info(f"[{self.name}] 斷路器半開，送出探測請求")
+        else:
+            logger.info(f"[{self.name}] 斷路器關閉，恢復正常輪詢")
+
+
+def _build_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        window=int(os.getenv("BREAKER_WINDOW", "20")),
+        min_calls=int(os.getenv("BREAKER_MIN_CALLS", "5")),
+        failure_rate=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+        slow_call_seconds=float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "10")),
+        open_seconds=float(os.getenv("BREAKER_OPEN_SECONDS", "30")),
+    )
+
+
+# 全域共享，所有帳號與課程共用同一組上游狀態
+breakers: dict[str, CircuitBreaker] = {name: _build_breaker(name) for name in ENDPOINTS.values()}
+
+BREAKER_STATUS_PATH = os.getenv("BREAKER_STATUS_PATH", "")
+
+
+def breaker_for_url(url: str) -> CircuitBreaker | None:
+    for prefix, name in ENDPOINTS.items():
+        if prefix in url:
+            return breakers[name]
+    return None
+
+
+def guarded_request(send, method: str, url: str, **kwargs):
+    # 依 URL 找出對應的斷路器；不屬於學校系統的請求直接送出
+    breaker = breaker_for_url(url)
+    if breaker is None:
+        return send(method, url, **kwargs)
+    return breaker.call(send, method, url, **kwargs)
+
+
+def status() -> dict[str, dict]:
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+def report_status():
+    # 非關閉狀態才記錄，避免每輪洗版
+    current = status()
+    degraded = {name: s for name, s in current.items() if s["state"] != CLOSED}
+    if degraded:
+        logger.warning(f"⚠️ 上游狀態異常：{degraded}")
+
+    if BREAKER_STATUS_PATH:
+        try:
+            with open(BREAKER_STATUS_PATH, "w", encoding="utf-8") as f:
+                json.dump({"updated_at": time.time(), "breakers": current}, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"❌ 無法寫入 {BREAKER_STATUS_PATH}: {e}")
@@ -1,19 +1,25 @@
 import logging
 import re
 import base64
+import threading
 from bs4 import BeautifulSoup
 from typing import Tuple, Dict, Optional
+from app import captcha_corpus
 from app.api_client import SessionManager
-from app.captcha_solver import CaptchaSolver
+from app.captcha_solver import CaptchaSolver, create_captcha_solver
+from app.circuit_breaker import CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
 class CourseEnroller:
     BASE_URL = "https://webapp.yuntech.edu.tw/AAXCCS/CourseSelectionRegister.aspx"
+    CANCELLED_MSG = "已取消（名額已由其他帳號取得）"
+    # 通過驗證碼後才會出現的結果訊息（成功或衝堂、額滿等選課結果），用來確認驗證碼標註正確
+    CAPTCHA_ACCEPTED_KEYWORDS = ("成功", "完成選課", "預定加選", "衝堂", "達修課上限", "已加選", "額滿", "人數已滿")
 
     def __init__(self, session_manager: SessionManager, captcha_solver: CaptchaSolver = None):
         self.session_manager = session_manager
-        self.captcha_solver = captcha_solver or CaptchaSolver()
+        self.captcha_solver = captcha_solver or create_captcha_solver()
 
     def _extract_asp_state(self, soup: BeautifulSoup) -> Dict[str, str]:
         state = {}
@@ -109,13 +115,17 @@ class CourseEnroller:
         soup_next = BeautifulSoup(resp_next.text, 'html.parser')
         return soup_next
 
-    def enroll(self, course_id: str) -> Tuple[bool, str]:
+    def enroll(self, course_id: str, cancel_event: Optional[threading.Event] = None) -> Tuple[bool, str]:
+        # cancel_event 被設定時，在下一次送出前放棄（已送出的請求無法收回）
+        cancelled = lambda: cancel_event is not None and cancel_event.is_set()
         try:
             max_flow_retries = 3
             msg = "未知結果"
             success = False
 
             for flow_attempt in range(max_flow_retries):
+                if cancelled():
+                    return False, self.CANCELLED_MSG
                 if flow_attempt > 0:
                     logger.warning(f"Retrying full enrollment flow (attempt {flow_attempt + 1}/{max_flow_retries})...")
 
@@ -131,17 +141,21 @@ class CourseEnroller:
                 empty_ocr_count = 0
 
                 while captcha_attempt < max_captcha_retries:
+                    if cancelled():
+                        return False, self.CANCELLED_MSG
                     captcha_text = ""
+                    captcha_b64 = None
                     captcha_img = current_soup.find('img', id=re.compile(r'Captcha', re.I))
                     if captcha_img:
                         src = captcha_img.get('src', '')
                         if src.startswith('data:image'):
+                            captcha_b64 = src
                             captcha_text = self.captcha_solver.solve_base64(src)
                         elif src:
                             full_url = "https://webapp.yuntech.edu.tw" + src if src.startswith('/') else src
                             c_resp = self.session_manager.get(full_url)
-                            b64 = base64.b64encode(c_resp.content).decode('ascii')
-                            captcha_text = self.captcha_solver.solve_base64(b64)
+                            captcha_b64 = base64.b64encode(c_resp.content).decode('ascii')
+                            captcha_text = self.captcha_solver.solve_base64(captcha_b64)
                         logger.debug(f"Enrollment captcha read (attempt {captcha_attempt + 1}): '{captcha_text}'")
                     else:
                         # 頁面上沒有驗證碼圖片就讀取頁面訊息
@@ -202,6 +216,13 @@ class CourseEnroller:
                     msg_label = soup_submit.find('span', id=re.compile(r'ProcessMsg'))
                     msg = msg_label.text.strip() if msg_label else ""
 
+                    # 出現選課結果訊息 -> 辨識正確；仍要求驗證碼 -> 辨識錯誤
+                    # 其他情況（session 過期、錯誤頁面）無法判斷，不收集
+                    if any(kw in msg for kw in self.CAPTCHA_ACCEPTED_KEYWORDS):
+                        captcha_corpus.record(captcha_b64, captcha_text, verified=True, source="enroll")
+                    elif soup_submit.find('input', id=re.compile(r'CaptchaTextBox', re.I)):
+                        captcha_corpus.record(captcha_b64, captcha_text, verified=False, source="enroll")
+
                     if "成功" in msg or "完成選課" in msg:
                         success = True
                         break
@@ -226,6 +247,9 @@ class CourseEnroller:
 
             return success, msg
 
+        except CircuitOpenError:
+            # 上游異常不是加選結果，交由呼叫端決定是否略過
+            raise
         except Exception as e:
             logger.error(f"Enrollment error for {course_id}: {e}")
             return False, str(e)
@@ -3,7 +3,9 @@ import os
 from bs4 import BeautifulSoup
 from typing import Optional
 from app.api_client import SessionManager
+from app import captcha_corpus
 from app.captcha_solver import CaptchaSolver
+from app.circuit_breaker import CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
@@ -58,13 +60,21 @@ class LoginManager:
                 post_resp = self.session_manager.post(self.LOGIN_URL, data=payload, timeout=10)
                 post_resp.raise_for_status()
                 
-                # 驗證登入狀態
-                if self.is_logged_in():
+                # 驗證登入狀態；查詢失敗時無法判斷驗證碼是否正確，不收集
+                logged_in = self._login_state()
+                if logged_in:
                     logger.info("Successfully logged in.")
+                    captcha_corpus.record(captcha_b64, captcha_text, verified=True, source="login")
                     return True
-                else:
+                elif logged_in is False:
                     logger.warning("Log in failed (possibly wrong captcha or credentials), retrying...")
+                    captcha_corpus.record(captcha_b64, captcha_text, verified=False, source="login")
+                else:
+                    logger.warning("Could not verify login status, retrying...")
                     
+            except CircuitOpenError:
+                # SSO 斷路器開啟中，不再浪費重試次數；交由呼叫端停止本輪加選
+                raise
             except Exception as e:
                 logger.error(f"Login error on attempt {attempt+1}: {e}")
                 
@@ -84,15 +94,21 @@ class LoginManager:
                     return text, b64
                 else:
                     logger.debug(f"Captcha length not 4 (got '{text}'), re-fetching...")
+            except CircuitOpenError:
+                raise
             except Exception as e:
                 logger.error(f"Error getting captcha: {e}")
         return None, None
 
     def is_logged_in(self) -> bool:
+        return self._login_state() is True
+
+    def _login_state(self) -> Optional[bool]:
+        # 查詢失敗（逾時、5xx、斷路器開啟）時回傳 None，與確定未登入區分
         try:
             resp = self.session_manager.get(self.VERIFY_URL, timeout=5)
             resp.raise_for_status()
             return resp.text.strip().lower() == "true"
         except Exception as e:
             logger.debug(f"Failed to check login status: {e}")
-            return False
+            return None
@@ -1,3 +1,4 @@
+import argparse
 import hashlib
 import json
 import os
@@ -5,11 +6,14 @@ import time
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-import requests.exceptions
 from app.scraper import CourseScraper
 from app.notifier import NotificationManager
-from app.captcha_solver import CaptchaSolver
+from app.captcha_solver import create_captcha_solver
 from app.user_agent import UserAgent
+from app.circuit_breaker import CLOSED, CircuitOpenError, breakers, report_status
+from app.transport import POOL_SIZE
+from app.allocator import ABORTED, CANCELLED, FULL, LOST, SKIPPED, WON, EnrollmentAllocator
+from app.scheduler import PollingProfile, PollingSchedule, SCHEDULE_JSON_PATH, load_schedule
 
 import logging
 
@@ -35,7 +39,7 @@ load_dotenv()
 INTERVAL = int(os.getenv("CRON_INTERVAL_SECONDS", "30"))
 
 # 全域共享，避免重複載入模型
-captcha_solver = CaptchaSolver()
+captcha_solver = create_captcha_solver()
 
 # 動態更新的設定
 user_agents: list[UserAgent] = []
@@ -44,6 +48,20 @@ _last_users_json_hash: str = ""
 
 USERS_JSON_PATH = os.getenv("USERS_JSON", "users.json")
 
+# 每門課同時加選的帳號數上限 = 剩餘名額 + ENROLL_EXTRA_ATTEMPTS
+ENROLL_EXTRA_ATTEMPTS = int(os.getenv("ENROLL_EXTRA_ATTEMPTS", "1"))
+
+# 永久性失敗關鍵字：確定無法加選，不需繼續監控
+PERMANENT_FAIL_KEYWORDS = ["衝堂", "達修課上限", "已加選"]
+# 名額已被搶走：停止本輪其他帳號的嘗試
+SEAT_FULL_KEYWORDS = ["額滿", "人數已滿"]
+
+# profile 模式下不改寫 users.json
+_dry_run = False
+
+# 加選執行緒會同時移除課程，users.json 與 ua.courses 的讀寫需互斥
+_config_lock = threading.Lock()
+
 
 def load_config():
     # 重新載入 users.json 並更新全域狀態
@@ -62,16 +80,23 @@ def load_config():
             logger.warning(f"⚠️ {USERS_JSON_PATH} 為空，略過更新")
             return
 
-        # 建立每個使用者的 UserAgent
-        new_user_agents = [
-            UserAgent(
-                account=u["account"],
-                password=u["password"],
-                courses=u["courses"],
-                captcha_solver=captcha_solver,
-            )
-            for u in users_config
-        ]
+        # 建立每個使用者的 UserAgent；帳密未變動的沿用原本的 Session，保留登入狀態
+        existing = {ua.account: ua for ua in user_agents}
+        new_user_agents = []
+        for u in users_config:
+            ua = existing.get(u["account"])
+            if ua and ua.password == u["password"]:
+                ua.courses = u["courses"]
+                ua.priority = u.get("priority", 0)
+            else:
+                ua = UserAgent(
+                    account=u["account"],
+                    password=u["password"],
+                    courses=u["courses"],
+                    captcha_solver=captcha_solver,
+                    priority=u.get("priority", 0),
+                )
+            new_user_agents.append(ua)
 
         # 整理所有要檢查的課程清單
         new_all_target_courses = list({c for ua in new_user_agents for c in ua.courses})
@@ -91,6 +116,10 @@ def load_config():
 
 def remove_course_from_config(account: str, course_id: str):
     # 加選成功後，從 users.json 移除該帳號對應的課程
+    if _dry_run:
+        logger.info(f"[{account}] (dry run) 略過從 {USERS_JSON_PATH} 移除課程 {course_id}")
+        return
+
     try:
         with open(USERS_JSON_PATH, encoding="utf-8") as f:
             users_config = json.load(f)
@@ -112,6 +141,28 @@ def remove_course_from_config(account: str, course_id: str):
 
 notifier = NotificationManager()
 
+# 依時段切換的輪詢設定（schedule.json）
+schedule = PollingSchedule(PollingProfile("default", INTERVAL, POOL_SIZE), [])
+_active_profile_name: str = ""
+
+
+def load_schedule_config():
+    # 讀取失敗時沿用上一次的設定
+    global schedule
+    try:
+        schedule = load_schedule(INTERVAL, POOL_SIZE)
+    except Exception as e:
+        logger.error(f"❌ Failed to reload {SCHEDULE_JSON_PATH}: {e}")
+
+
+def current_profile() -> PollingProfile:
+    global _active_profile_name
+    profile = schedule.current_profile()
+    if profile.name != _active_profile_name:
+        logger.info(f"切換輪詢設定：{profile}")
+        _active_profile_name = profile.name
+    return profile
+
 # 每個課程設定一個 CourseScraper（持久化 Session，支援 keep-alive）
 _course_scrapers: dict[str, CourseScraper] = {}
 
@@ -122,6 +173,7 @@ def _get_scraper(course_id: str) -> CourseScraper:
 
 # 初始載入
 load_config()
+load_schedule_config()
 
 
 def _scrape_course(course_id: str):
@@ -133,6 +185,9 @@ def _scrape_course(course_id: str):
         elapsed = time.monotonic() - t0
         logger.debug(f"[{course_id}] 抓取完成，耗時 {elapsed:.1f}s")
         return course_id, result
+    except CircuitOpenError:
+        # 斷路器直接拒絕，scraper 本身沒有問題，保留連線
+        raise
     except Exception:
         elapsed = time.monotonic() - t0
         logger.debug(f"[{course_id}] 抓取失敗，耗時 {elapsed:.1f}s")
@@ -140,98 +195,218 @@ def _scrape_course(course_id: str):
         raise
 
 
-def job():
-    # 重新載入設定
-    load_config()
+# 預先登入使用獨立的執行緒池，不佔用抓取的並行數，也不阻擋加選開始
+WARM_SESSION_WORKERS = int(os.getenv("WARM_SESSION_WORKERS", "4"))
+_warm_executor = ThreadPoolExecutor(max_workers=WARM_SESSION_WORKERS, thread_name_prefix="warm")
+_warming: set[str] = set()
+_warming_lock = threading.Lock()
 
-    if not all_target_courses:
-        return
 
-    # 並行抓取所有課程名額
+def _warm_session(ua: UserAgent):
+    # 搶課時段內預先登入，有名額時不用再花時間登入
+    try:
+        if breakers["SSO"].is_rejecting():
+            return
+        with ua.lock:
+            if not ua.ensure_logged_in():
+                logger.warning(f"[{ua.account}] 預先登入失敗")
+    except CircuitOpenError as e:
+        logger.warning(f"[{ua.account}] 略過預先登入：{e}")
+    finally:
+        with _warming_lock:
+            _warming.discard(ua.account)
+
+
+def _submit_warm_session(ua: UserAgent):
+    # 上一輪的預先登入還沒結束就不重複送出
+    with _warming_lock:
+        if ua.account in _warming:
+            return
+        _warming.add(ua.account)
+    _warm_executor.submit(_warm_session, ua)
+
+
+def _scrape_courses(course_ids: list[str], profile: PollingProfile) -> tuple[dict[str, tuple[int, int, str]], list[str]]:
+    # 回傳 (有餘額的課程, 被斷路器拒絕的課程)
     available_courses: dict[str, tuple[int, int, str]] = {}
-    with ThreadPoolExecutor(max_workers=len(all_target_courses) or 1) as executor:
-        futures = {executor.submit(_scrape_course, cid): cid for cid in all_target_courses}
+    short_circuited: list[str] = []
+    # 並行數不超過時段設定與連線池大小，避免執行緒等待或丟棄連線
+    max_workers = min(len(course_ids), profile.max_concurrency, POOL_SIZE) or 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_scrape_course, cid): cid for cid in course_ids}
         for future in as_completed(futures):
             course_id = futures[future]
             try:
                 _, (enrolled, limit, name) = future.result()
                 if enrolled < limit:
                     available_courses[course_id] = (enrolled, limit, name)
+            except CircuitOpenError:
+                short_circuited.append(course_id)
             except Exception as e:
                 logger.error(f"Error scraping {course_id}: {e}")
+    return available_courses, short_circuited
+
+
+def job():
+    # 重新載入設定
+    load_config()
+    load_schedule_config()
+    profile = current_profile()
+
+    if not all_target_courses:
+        return
+
+    if profile.warm_sessions:
+        for ua in user_agents:
+            if ua.courses:
+                _submit_warm_session(ua)
+
+    # 並行抓取所有課程名額
+    available_courses, short_circuited = _scrape_courses(all_target_courses, profile)
+
+    # 半開時只有探測請求會送出，其餘課程被直接拒絕；探測成功後立即補抓，不必等到下一輪
+    if short_circuited and breakers["QueryCour"].state == CLOSED:
+        logger.info(f"QueryCour 已恢復，補抓 {len(short_circuited)} 門課程")
+        retried, short_circuited = _scrape_courses(short_circuited, profile)
+        available_courses.update(retried)
+
+    if short_circuited:
+        logger.warning(f"⚠️ QueryCour 斷路器開啟中，略過 {len(short_circuited)} 門課程：{short_circuited}")
 
     if not available_courses:
         return
 
-    # 嘗試為每個使用者加選有餘額的課程
-    for ua in user_agents:
-        user_available = [
-            cid for cid in ua.courses
-            if cid in available_courses
-        ]
-        if not user_available:
-            continue
+    # 登入或加選系統異常時，本輪不送出加選
+    for name in ("SSO", "AAXCCS"):
+        if breakers[name].is_rejecting():
+            logger.warning(f"⚠️ {name} 斷路器開啟中，略過本輪加選：{list(available_courses)}")
+            return
+
+    # 依剩餘名額與優先順序分配加選嘗試
+    seats = {cid: limit - enrolled for cid, (enrolled, limit, _) in available_courses.items()}
+    allocator = EnrollmentAllocator(
+        lambda ua, cid, cancel: _attempt_enroll(ua, cid, available_courses[cid][2], cancel),
+        extra_attempts=ENROLL_EXTRA_ATTEMPTS,
+        max_workers=min(sum(seats.values()) + ENROLL_EXTRA_ATTEMPTS * len(seats), POOL_SIZE) or 1,
+    )
+    allocator.run(seats, user_agents)
+
+
+def _stop_monitoring(ua: UserAgent, course_id: str):
+    with _config_lock:
+        remove_course_from_config(ua.account, course_id)
+        # 同一 job cycle 內也移除，避免重複嘗試
+        if course_id in ua.courses:
+            ua.courses.remove(course_id)
+
+
+def _notify(message: str):
+    try:
+        notifier.send_message(message)
+    except Exception:
+        pass
+
+
+def _attempt_enroll(ua: UserAgent, course_id: str, name: str, cancel: threading.Event):
+    # 回傳 (結果, 後續動作)；通知與移除設定交由 allocator 在取消其餘嘗試後執行
+    with ua.lock:
+        if cancel.is_set():
+            return CANCELLED, None
 
         # 登入使用者
-        if not ua.ensure_logged_in():
-            logger.warning(f"[{ua.account}] 登入失敗，略過加選")
-            continue
-
-        for course_id in user_available:
-            enrolled, limit, name = available_courses[course_id]
-
-            logger.info(f"[{ua.account}] 正在嘗試加選 {course_id}...")
-            success, reason = ua.enroller.enroll(course_id)
-
-            # 永久性失敗關鍵字：確定無法加選，不需繼續監控
-            PERMANENT_FAIL_KEYWORDS = ["衝堂", "達修課上限", "已加選"]
-            is_permanent = not success and any(kw in reason for kw in PERMANENT_FAIL_KEYWORDS)
-
-            if success:
-                logger.success(f"[{ua.account}] 成功加選 {course_id}")
-                notifier.send_message(f"🎉 選課成功！\n課程：{name} ({course_id})")
-                remove_course_from_config(ua.account, course_id)
-                # 同一 job cycle 內也移除，避免重複嘗試
-                if course_id in ua.courses:
-                    ua.courses.remove(course_id)
-            elif is_permanent:
-                logger.warning(f"[{ua.account}] {course_id} 停止監控：{reason}")
-                remove_course_from_config(ua.account, course_id)
-                if course_id in ua.courses:
-                    ua.courses.remove(course_id)
-                try:
-                    notifier.send_message(
-                        f"⛔ 無法加選，已停止監控\n"
-                        f"學號：{ua.account}\n"
-                        f"課程：{name} ({course_id})\n"
-                        f"原因：{reason}"
-                    )
-                except Exception:
-                    pass
-            else:
-                logger.error(f"[{ua.account}] {course_id} 加選失敗: {reason}")
-                try:
-                    notifier.send_message(
-                        f"❌ 加選失敗！\n"
-                        f"學號：{ua.account}\n"
-                        f"課程：{name} ({course_id})\n"
-                        f"原因：{reason}"
-                    )
-                except Exception:
-                    pass
+        try:
+            if not ua.ensure_logged_in():
+                logger.warning(f"[{ua.account}] 登入失敗，略過加選 {course_id}")
+                return LOST, None
+        except CircuitOpenError as e:
+            logger.warning(f"[{ua.account}] {course_id} 略過加選：{e}")
+            return ABORTED, None
+
+        logger.info(f"[{ua.account}] 正在嘗試加選 {course_id}...")
+        try:
+            success, reason = ua.enroller.enroll(course_id, cancel_event=cancel)
+        except CircuitOpenError as e:
+            logger.warning(f"[{ua.account}] {course_id} 略過加選：{e}")
+            return ABORTED, None
+
+    is_permanent = not success and any(kw in reason for kw in PERMANENT_FAIL_KEYWORDS)
+    is_full = not success and any(kw in reason for kw in SEAT_FULL_KEYWORDS)
+
+    if success:
+        logger.success(f"[{ua.account}] 成功加選 {course_id}")
+
+        def followup():
+            _stop_monitoring(ua, course_id)
+            _notify(f"🎉 選課成功！\n課程：{name} ({course_id})")
+        return WON, followup
+    elif reason == ua.enroller.CANCELLED_MSG:
+        logger.info(f"[{ua.account}] {course_id} {reason}")
+        return CANCELLED, None
+    elif is_permanent:
+        logger.warning(f"[{ua.account}] {course_id} 停止監控：{reason}")
+
+        def followup():
+            _stop_monitoring(ua, course_id)
+            _notify(
+                f"⛔ 無法加選，已停止監控\n"
+                f"學號：{ua.account}\n"
+                f"課程：{name} ({course_id})\n"
+                f"原因：{reason}"
+            )
+        return SKIPPED, followup
+    elif is_full:
+        # 名額已被搶走，下次查詢有餘額時再試
+        logger.warning(f"[{ua.account}] {course_id} 名額已滿：{reason}")
+        return FULL, None
+    else:
+        logger.error(f"[{ua.account}] {course_id} 加選失敗: {reason}")
+        return LOST, lambda: _notify(
+            f"❌ 加選失敗！\n"
+            f"學號：{ua.account}\n"
+            f"課程：{name} ({course_id})\n"
+            f"原因：{reason}"
+        )
+
+
+def run_profile_mode(cycles: int, output_dir: str, backend: str, recording_path: str):
+    global _dry_run
+    from app.profiler import run_profile
+
+    # 不發送通知、不改寫設定檔，避免分析時影響正式環境
+    _dry_run = True
+    notifier.webhook_url = None
+
+    logger.info(f"Profiling {cycles} cycles (backend={backend})")
+    run_profile(job, cycles, output_dir, backend=backend, recording_path=recording_path)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="YunTech Course Bot")
+    parser.add_argument("--profile", action="store_true", default=os.getenv("PROFILE", "") == "1",
+                        help="執行固定次數的 job() 並輸出效能分析報告")
+    parser.add_argument("--cycles", type=int, default=int(os.getenv("PROFILE_CYCLES", "5")))
+    parser.add_argument("--profile-output", default=os.getenv("PROFILE_OUTPUT", "profile_output"))
+    parser.add_argument("--backend", choices=("live", "record", "replay"), default=os.getenv("PROFILE_BACKEND", "live"),
+                        help="live: 連線學校系統；record: 連線並錄製回應；replay: 回放錄製的回應")
+    parser.add_argument("--recording", default=os.getenv("PROFILE_RECORDING", "recording.json"))
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile_mode(args.cycles, args.profile_output, args.backend, args.recording)
+        raise SystemExit(0)
+
     logger.info(f"Course Bot started")
 
     # 啟動時執行一次（同步）
     job()
-
-    # 最長容許 job() 執行的時間（防止卡住）
-    JOB_TIMEOUT = INTERVAL * 4
+    report_status()
 
     while True:
-        time.sleep(INTERVAL)
+        # 依目前時段決定等待時間；下個搶課時段開始時會提早醒來
+        time.sleep(schedule.seconds_until_next_run())
+
+        # 最長容許 job() 執行的時間（防止卡住）
+        JOB_TIMEOUT = max(INTERVAL, schedule.current_profile().interval) * 4
 
         # 在 daemon thread 中執行 job，避免卡住主迴圈
         t = threading.Thread(target=job, daemon=True)
@@ -239,3 +414,4 @@ if __name__ == "__main__":
         t.join(timeout=JOB_TIMEOUT)
         if t.is_alive():
             logger.warning(f"⚠️ job() 執行超過 {JOB_TIMEOUT}s，已放棄本次執行，下次繼續")
+        report_status()
@@ -1,7 +1,7 @@
-import requests
 import os
 from dotenv import load_dotenv
 import logging
+from app.transport import create_session
 
 logger = logging.getLogger(__name__)
 
@@ -11,13 +11,15 @@ load_dotenv()
 class NotificationManager:
     def __init__(self):
         self.webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
+        # Discord 憑證正常，需驗證
+        self.session = create_session(verify=True)
 
     def send_message(self, text: str):
         if not self.webhook_url:
             return
 
         try:
-            response = requests.post(self.webhook_url, json={"content": text}, timeout=10)
+            response = self.session.post(self.webhook_url, json={"content": text}, timeout=10)
             response.raise_for_status()
             logger.info("Notification sent successfully")
         except Exception as e:
@@ -0,0 +1,319 @@
+import base64
+import functools
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from urllib.parse import parse_qsl
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from app import transport
+from app.captcha_solver import CaptchaSolver
+from app.course_enroller import CourseEnroller
+from app.login_manager import LoginManager
+from app.scraper import CourseScraper
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("live", "record", "replay")
+
+# 每個 form 欄位都會變動的 ASP.NET 狀態與驗證碼，不列入錄製比對的 key
+_VOLATILE_FIELD_MARKERS = ("captcha", "psecretstring")
+
+# 錄製檔可能被分享，密碼不列入 key；帳號以雜湊區分，不留明文
+_SECRET_FIELD_MARKERS = ("password",)
+_ACCOUNT_FIELD_MARKERS = ("loginname",)
+
+# response 內容已解壓，回放時不能再帶長度與編碼標頭；cookie 為登入憑證，不寫入錄製檔
+_DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "set-cookie", "cookie")
+
+
+class StageTimer:
+    def __init__(self):
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._patched: list[tuple[type, str, object]] = []
+
+    def wrap(self, stage: str, owner: type, attr: str):
+        original = getattr(owner, attr)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - t0
+                with self._lock:
+                    self.durations[stage].append(elapsed)
+
+        setattr(owner, attr, timed)
+        self._patched.append((owner, attr, original))
+
+    def restore(self):
+        for owner, attr, original in reversed(self._patched):
+            setattr(owner, attr, original)
+        self._patched.clear()
+
+    def summary(self) -> dict[str, dict]:
+        result = {}
+        for stage, values in self.durations.items():
+            ordered = sorted(values)
+            result[stage] = {
+                "calls": len(ordered),
+                "total": round(sum(ordered), 4),
+                "mean": round(sum(ordered) / len(ordered), 4),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+                "max": round(ordered[-1], 4),
+            }
+        return result
+
+
+# 堆疊最內層停在這些地方的執行緒是在等待工作或其他執行緒，不計入熱點函式
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+_IDLE_FRAMES = ("_worker (thread.py",)
+
+
+class StackSampler:
+    # 定時取樣所有執行緒的呼叫堆疊，輸出 flamegraph.pl / speedscope 可讀的 folded 格式
+    # 抓取與加選都在 worker 執行緒執行；cProfile 在 3.12 起同時只能有一個、且無法分執行緒統計，因此以取樣為準
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(frames))] += 1
+
+    def write_folded(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+    def hot_functions(self, limit: int = 30) -> list[dict]:
+        # self：樣本最內層正在執行該函式；total：該函式出現在堆疊中（含呼叫的函式）
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        busy = 0
+        for stack, count in self.stacks.items():
+            leaf = stack[-1]
+            if leaf.startswith(_IDLE_FRAMES) or any(f"({name}:" in leaf for name in _IDLE_FILES):
+                continue
+            busy += count
+            own[leaf] += count
+            for frame in set(stack):
+                total[frame] += count
+
+        return [
+            {
+                "function": frame,
+                "self": own[frame],
+                "total": count,
+                "self_pct": round(own[frame] / busy * 100, 1),
+                "total_pct": round(count / busy * 100, 1),
+            }
+            for frame, count in sorted(total.items(), key=lambda kv: (-own[kv[0]], -kv[1]))[:limit]
+        ]
+
+
+def _request_key(request: requests.PreparedRequest) -> str:
+    body = request.body or ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+
+    fields = []
+    for name, value in parse_qsl(body, keep_blank_values=True):
+        lowered = name.lower()
+        if name.startswith("__") or any(m in lowered for m in _VOLATILE_FIELD_MARKERS + _SECRET_FIELD_MARKERS):
+            continue
+        if any(m in lowered for m in _ACCOUNT_FIELD_MARKERS):
+            value = hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+        fields.append((name, value))
+    return json.dumps([request.method, request.url, sorted(fields)], ensure_ascii=False)
+
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, inner: HTTPAdapter):
+        super().__init__()
+        self.inner = inner
+        self.recordings: dict[str, list[dict]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        resp = self.inner.send(request, **kwargs)
+        entry = {
+            "status": resp.status_code,
+            "headers": {k: v for k, v in resp.headers.items() if k.lower() not in _DROPPED_HEADERS},
+            "body": base64.b64encode(resp.content).decode("ascii"),
+        }
+        with self._lock:
+            self.recordings[_request_key(request)].append(entry)
+        return resp
+
+    def close(self):
+        self.inner.close()
+
+    def save(self, path: str):
+        with self._lock:
+            data = dict(self.recordings)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        logger.info(f"已錄製 {sum(len(v) for v in data.values())} 筆回應至 {path}")
+
+
+class ReplayAdapter(HTTPAdapter):
+    # 依序回放錄製的回應；同一請求錄到多筆時循環使用
+    def __init__(self, path: str):
+        super().__init__()
+        with open(path, encoding="utf-8") as f:
+            self.recordings: dict[str, list[dict]] = json.load(f)
+        self._cursor: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        key = _request_key(request)
+        entries = self.recordings.get(key)
+        if not entries:
+            raise requests.exceptions.ConnectionError(f"No recorded response for {request.method} {request.url}")
+
+        with self._lock:
+            entry = entries[self._cursor[key] % len(entries)]
+            self._cursor[key] += 1
+
+        resp = requests.Response()
+        resp.status_code = entry["status"]
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp._content = base64.b64decode(entry["body"])
+        resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+        resp.url = request.url
+        resp.request = request
+        resp.reason = ""
+        resp.connection = self
+        return resp
+
+    def close(self):
+        pass
+
+
+def _install_stage_timers(timer: StageTimer):
+    timer.wrap("scrape", CourseScraper, "get_course_info")
+    timer.wrap("parse", BeautifulSoup, "__init__")
+    timer.wrap("ocr", CaptchaSolver, "solve_base64")
+    timer.wrap("login", LoginManager, "login")
+    timer.wrap("enroll", CourseEnroller, "enroll")
+
+
+def _format_report(cycles: int, cycle_times: list[float], stages: dict, hot: list[dict], memory_text: str, peak: int) -> str:
+    lines = [f"Profile: {cycles} cycles", ""]
+    lines.append("== Cycle wall time (s) ==")
+    for i, elapsed in enumerate(cycle_times, 1):
+        lines.append(f"  #{i}: {elapsed:.3f}")
+    lines.append("")
+    lines.append("== Stage wall time (s) ==")
+    lines.append(f"  {'stage':<8}{'calls':>7}{'total':>10}{'mean':>10}{'p95':>10}{'max':>10}")
+    for stage, s in sorted(stages.items(), key=lambda kv: -kv[1]["total"]):
+        lines.append(f"  {stage:<8}{s['calls']:>7}{s['total']:>10.3f}{s['mean']:>10.4f}{s['p95']:>10.4f}{s['max']:>10.4f}")
+    lines.append("")
+    lines.append("== Hot functions (stack samples, all threads, idle waits excluded) ==")
+    lines.append(f"  {'self%':>7}{'total%':>8}  function")
+    for h in hot:
+        lines.append(f"  {h['self_pct']:>7.1f}{h['total_pct']:>8.1f}  {h['function']}")
+    lines.append("")
+    lines.append(f"== Memory (tracemalloc, separate cycle, peak {peak / 1024 / 1024:.1f} MiB, top growth) ==")
+    lines.append(memory_text)
+    return "\n".join(lines)
+
+
+def run_profile(job, cycles: int, output_dir: str, backend: str = "live", recording_path: str = "recording.json") -> dict:
+    # 執行 cycles 次 job() 量測耗時與熱點，再另跑一次 job() 量測記憶體
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown profile backend: {backend}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    recorder = None
+    if backend == "record":
+        recorder = RecordingAdapter(transport.get_adapter())
+        transport.install_adapter(recorder)
+    elif backend == "replay":
+        transport.install_adapter(ReplayAdapter(recording_path))
+
+    timer = StageTimer()
+    _install_stage_timers(timer)
+    sampler = StackSampler(float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005")))
+    sampler.start()
+
+    cycle_times = []
+    try:
+        for i in range(cycles):
+            t0 = time.perf_counter()
+            job()
+            cycle_times.append(time.perf_counter() - t0)
+            logger.info(f"[profile] cycle {i + 1}/{cycles} 耗時 {cycle_times[-1]:.3f}s")
+    finally:
+        sampler.stop()
+        timer.restore()
+
+    # tracemalloc 會大幅拖慢解析與 OCR 的配置，不與計時的 cycle 同時開啟
+    logger.info("[profile] memory cycle")
+    tracemalloc.start(25)
+    try:
+        baseline = tracemalloc.take_snapshot()
+        job()
+        final = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    if recorder:
+        recorder.save(recording_path)
+
+    hot = sampler.hot_functions()
+    memory_lines = [str(stat) for stat in final.compare_to(baseline, "lineno")[:25]]
+    sampler.write_folded(os.path.join(output_dir, "stacks.folded"))
+
+    stages = timer.summary()
+    summary = {
+        "cycles": cycles,
+        "backend": backend,
+        "cycle_seconds": [round(t, 4) for t in cycle_times],
+        "stages": stages,
+        "hot_functions": hot,
+        "tracemalloc_peak_bytes": peak,
+        "samples": sum(sampler.stacks.values()),
+    }
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    report = _format_report(cycles, cycle_times, stages, hot, "\n".join(memory_lines), peak)
+    with open(os.path.join(output_dir, "report.txt"), "w", encoding="utf-8") as f:
+        f.write(report)
+
+    logger.info(f"[profile] 報告已輸出至 {output_dir}（report.txt, summary.json, stacks.folded）")
+    return summary
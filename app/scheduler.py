@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+SCHEDULE_JSON_PATH = os.getenv("SCHEDULE_JSON", "schedule.json")
+
+# 台灣沒有日光節約時間，固定 UTC+8 即可，不依賴容器時區
+_offset_match = re.fullmatch(r"([+-])(\d{2}):(\d{2})", os.getenv("SCHEDULE_UTC_OFFSET", "+08:00"))
+if not _offset_match:
+    raise ValueError("SCHEDULE_UTC_OFFSET must look like +08:00")
+_sign = 1 if _offset_match.group(1) == "+" else -1
+SCHEDULE_TZ = timezone(_sign * timedelta(hours=int(_offset_match.group(2)), minutes=int(_offset_match.group(3))))
+
+
+class PollingProfile:
+    def __init__(self, name: str, interval: float, max_concurrency: int, warm_sessions: bool = False):
+        self.name = name
+        self.interval = interval
+        self.max_concurrency = max_concurrency
+        self.warm_sessions = warm_sessions
+
+    def __repr__(self):
+        return (f"{self.name}(interval={self.interval}s, max_concurrency={self.max_concurrency}, "
+                f"warm_sessions={self.warm_sessions})")
+
+
+class TimeWindow:
+    # start / end 可為 "YYYY-MM-DD HH:MM"（單次）或 "HH:MM"（每日）
+    def __init__(self, start: str, end: str, profile: PollingProfile):
+        self.daily = len(start) <= 5
+        if self.daily != (len(end) <= 5):
+            raise ValueError(f"Window '{profile.name}' mixes daily and dated times")
+        self.profile = profile
+        if self.daily:
+            self.start = datetime.strptime(start, "%H:%M").time()
+            self.end = datetime.strptime(end, "%H:%M").time()
+        else:
+            self.start = datetime.strptime(start, "%Y-%m-%d %H:%M").replace(tzinfo=SCHEDULE_TZ)
+            self.end = datetime.strptime(end, "%Y-%m-%d %H:%M").replace(tzinfo=SCHEDULE_TZ)
+
+    def contains(self, now: datetime) -> bool:
+        if not self.daily:
+            return self.start <= now < self.end
+        t = now.timetz().replace(tzinfo=None)
+        if self.start <= self.end:
+            return self.start <= t < self.end
+        # 跨午夜，例如 23:00 - 01:00
+        return t >= self.start or t < self.end
+
+    def next_start(self, now: datetime) -> datetime | None:
+        if not self.daily:
+            return self.start if self.start > now else None
+        candidate = datetime.combine(now.date(), self.start, tzinfo=SCHEDULE_TZ)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        return candidate
+
+
+class PollingSchedule:
+    def __init__(self, default: PollingProfile, windows: list[TimeWindow]):
+        self.default = default
+        self.windows = windows
+
+    def current_profile(self, now: datetime | None = None) -> PollingProfile:
+        now = now or datetime.now(SCHEDULE_TZ)
+        # 重疊時以設定檔中較前面的時段為準
+        for window in self.windows:
+            if window.contains(now):
+                return window.profile
+        return self.default
+
+    def seconds_until_next_run(self, now: datetime | None = None) -> float:
+        # 一般情況睡一個 interval；若下個時段更早開始，提早醒來切換
+        now = now or datetime.now(SCHEDULE_TZ)
+        wait = self.current_profile(now).interval
+        for window in self.windows:
+            start = window.next_start(now)
+            if start is not None:
+                wait = min(wait, (start - now).total_seconds())
+        return max(wait, 0.0)
+
+
+# interval 過小會讓主迴圈不停送出查詢，等同對學校系統發動洪水請求
+MIN_INTERVAL_SECONDS = 1.0
+
+
+def _parse_profile(name: str, raw: dict, fallback: PollingProfile) -> PollingProfile:
+    interval = float(raw.get("interval", fallback.interval))
+    max_concurrency = int(raw.get("max_concurrency", fallback.max_concurrency))
+    if "interval" in raw and interval < MIN_INTERVAL_SECONDS:
+        raise ValueError(f"'{name}' interval must be at least {MIN_INTERVAL_SECONDS:g}s, got {raw['interval']}")
+    if "max_concurrency" in raw and max_concurrency < 1:
+        raise ValueError(f"'{name}' max_concurrency must be at least 1, got {raw['max_concurrency']}")
+    return PollingProfile(
+        name=name,
+        interval=interval,
+        max_concurrency=max_concurrency,
+        warm_sessions=bool(raw.get("warm_sessions", fallback.warm_sessions)),
+    )
+
+
+def load_schedule(default_interval: float, default_concurrency: int) -> PollingSchedule:
+    # 沒有 schedule.json 時維持固定 INTERVAL 的舊行為
+    base = PollingProfile("default", default_interval, default_concurrency)
+    if not os.path.isfile(SCHEDULE_JSON_PATH):
+        return PollingSchedule(base, [])
+
+    with open(SCHEDULE_JSON_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+
+    default = _parse_profile("default", config.get("default", {}), base)
+    windows = [
+        TimeWindow(w["start"], w["end"], _parse_profile(w.get("name", f"window-{i}"), w, default))
+        for i, w in enumerate(config.get("windows", []))
+    ]
+    return PollingSchedule(default, windows)
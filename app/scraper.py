@@ -1,23 +1,14 @@
-import requests
 import re
-import urllib3
 from bs4 import BeautifulSoup
 from typing import Tuple, Optional
+from app.api_client import SessionManager
 
 class CourseScraper:
     BASE_URL = "https://webapp.yuntech.edu.tw/WebNewCAS/Course/QueryCour.aspx"
 
     def __init__(self, session_manager=None):
-        if session_manager:
-            self.session = session_manager
-        else:
-            self.session = requests.Session()
-            self.session.headers.update({
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            })
-            # 針對不正常證書的目標伺服器禁用 SSL 警告
-            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-            self.session.verify = False
+        # 透過 SessionManager 發送請求，才會經過 QueryCour 斷路器
+        self.session = session_manager or SessionManager()
 
     def get_course_info(self, course_id: str) -> Tuple[int, int, str]:
         # 取得 tokens
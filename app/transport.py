@@ -0,0 +1,176 @@
+import logging
+import os
+import socket
+import threading
+import time
+import requests
+import urllib3
+from dotenv import load_dotenv
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# 單一 host 的連線池上限，需不小於同時發出請求的執行緒數
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+# GET 在連線錯誤與 502/503/504 時的重試次數；POST 只在請求送出前的連線錯誤重試，避免重複送出表單
+GET_RETRIES = int(os.getenv("HTTP_GET_RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+DNS_CACHE_SECONDS = float(os.getenv("DNS_CACHE_SECONDS", "300"))
+# 只快取學校系統的 DNS，Discord 等其他連線照常查詢
+DNS_CACHE_HOSTS = {h.strip() for h in os.getenv("DNS_CACHE_HOSTS", "webapp.yuntech.edu.tw").split(",") if h.strip()}
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+# 針對不正常證書的目標伺服器禁用 SSL 警告
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+_adapter: HTTPAdapter | None = None
+_adapter_lock = threading.Lock()
+
+
+_dns_cache: dict[tuple, tuple[float, list[str]]] = {}
+_dns_lock = threading.Lock()
+
+
+def _resolve(host: str, port: int) -> list[str]:
+    key = (host, port, allowed_gai_family())
+    now = time.monotonic()
+    with _dns_lock:
+        cached = _dns_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    addresses = []
+    for _, _, _, _, sockaddr in socket.getaddrinfo(host, port, key[2], socket.SOCK_STREAM):
+        if sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_CACHE_SECONDS, addresses)
+    return addresses
+
+
+def _forget(host: str):
+    # 連線失敗時丟棄快取，下次重新查詢，避免 IP 變更後一直連到舊位址
+    with _dns_lock:
+        for key in [k for k in _dns_cache if k[0] == host]:
+            del _dns_cache[key]
+
+
+class _CachedDNSConnection:
+    # 建立新連線時改用快取的 IP；TLS 的 SNI 與憑證驗證仍使用原本的 host
+    def _new_conn(self):
+        host = self._dns_host
+        if DNS_CACHE_SECONDS <= 0 or host not in DNS_CACHE_HOSTS:
+            return super()._new_conn()
+
+        try:
+            addresses = _resolve(host, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+
+        try:
+            for i, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError:
+                    if i == len(addresses) - 1:
+                        _forget(host)
+                        raise
+        finally:
+            self._dns_host = host
+
+
+class _HTTPConnection(_CachedDNSConnection, HTTPConnection):
+    pass
+
+
+class _HTTPSConnection(_CachedDNSConnection, HTTPSConnection):
+    pass
+
+
+class _HTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _HTTPConnection
+
+
+class _HTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _HTTPSConnection
+
+
+class _CachedDNSAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _HTTPConnectionPool, "https": _HTTPSConnectionPool}
+
+
+def _build_adapter() -> HTTPAdapter:
+    retry = Retry(
+        total=GET_RETRIES,
+        connect=GET_RETRIES,
+        # 讀取逾時不重試：上游卡住時每次都要等滿 timeout，交給斷路器處理
+        read=0,
+        status=GET_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        # 最後一次仍失敗時回傳原始 response，由呼叫端 raise_for_status
+        raise_on_status=False,
+    )
+    return _CachedDNSAdapter(
+        pool_connections=4,
+        pool_maxsize=POOL_SIZE,
+        max_retries=retry,
+    )
+
+
+class _SharedAdapter(BaseAdapter):
+    # 所有 Session 掛載同一個轉接層，實際送出交給目前的 adapter；
+    # install_adapter() 替換後，已建立的 Session 也會立即改用新的 adapter
+    def send(self, request, **kwargs):
+        return get_adapter().send(request, **kwargs)
+
+    def close(self):
+        # 連線池為全域共用，單一 Session 關閉時不關閉
+        pass
+
+
+_shared_adapter = _SharedAdapter()
+
+
+def get_adapter() -> HTTPAdapter:
+    # 所有 Session 共用同一個 adapter（連線池），keep-alive 連線與 TLS 連線可跨帳號重用
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            _adapter = _build_adapter()
+            logger.debug(f"HTTP transport ready (pool_maxsize={POOL_SIZE}, get_retries={GET_RETRIES})")
+        return _adapter
+
+
+def install_adapter(adapter: HTTPAdapter):
+    # 替換共用 adapter（例如錄製／回放），已建立與之後建立的 Session 都會使用
+    global _adapter
+    with _adapter_lock:
+        _adapter = adapter
+
+
+def create_session(verify: bool = False) -> requests.Session:
+    # 每個帳號／scraper 各自一個 Session（Cookie 隔離），底層共用連線池
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.verify = verify
+    session.mount("https://", _shared_adapter)
+    session.mount("http://", _shared_adapter)
+    return session
@@ -1,3 +1,4 @@
+import threading
 from app.api_client import SessionManager
 from app.captcha_solver import CaptchaSolver
 from app.login_manager import LoginManager
@@ -11,10 +12,15 @@ class UserAgent:
         password: str,
         courses: list[str],
         captcha_solver: CaptchaSolver,
+        priority: int = 0,
     ):
         self.account = account
         self.password = password
         self.courses = courses
+        # 多帳號搶同一名額時，priority 大者優先
+        self.priority = priority
+        # 同一帳號的 ASP.NET 頁面狀態不能同時進行兩個加選流程
+        self.lock = threading.Lock()
 
         # 每個使用者擁有獨立會話
         self.session = SessionManager()
@@ -0,0 +1,116 @@
+import threading
+
+from app.allocator import ABORTED, CANCELLED, FULL, LOST, SKIPPED, WON, EnrollmentAllocator
+
+
+class _Account:
+    def __init__(self, account: str, courses: list[str], priority: int = 0):
+        self.account = account
+        self.courses = courses
+        self.priority = priority
+
+
+def _scripted(outcomes: dict[str, str], calls: list[str]):
+    # 依帳號回傳預先決定的結果，並記錄嘗試順序
+    lock = threading.Lock()
+
+    def attempt(ua, course_id, cancel):
+        with lock:
+            calls.append(ua.account)
+        return outcomes[ua.account], None
+    return attempt
+
+
+def test_candidates_are_tried_in_priority_order():
+    calls = []
+    accounts = [_Account("low", ["A"], 0), _Account("high", ["A"], 5), _Account("mid", ["A"], 1)]
+    allocator = EnrollmentAllocator(_scripted({"low": WON, "high": LOST, "mid": SKIPPED}, calls), extra_attempts=0)
+
+    assert allocator.run({"A": 1}, accounts) == {"A": 1}
+    assert calls == ["high", "mid", "low"]
+
+
+def test_lost_attempt_is_replaced_until_seat_is_won():
+    calls = []
+    accounts = [_Account(name, ["A"]) for name in ("a", "b", "c")]
+    allocator = EnrollmentAllocator(_scripted({"a": LOST, "b": WON, "c": WON}, calls), extra_attempts=0)
+
+    assert allocator.run({"A": 1}, accounts) == {"A": 1}
+    assert calls == ["a", "b"]
+
+
+def test_full_or_aborted_stops_the_course():
+    for outcome in (FULL, ABORTED):
+        calls = []
+        accounts = [_Account(name, ["A"]) for name in ("a", "b")]
+        allocator = EnrollmentAllocator(_scripted({"a": outcome, "b": WON}, calls), extra_attempts=0)
+
+        assert allocator.run({"A": 1}, accounts) == {"A": 0}
+        assert calls == ["a"]
+
+
+def test_only_accounts_monitoring_open_courses_are_used():
+    calls = []
+    accounts = [_Account("a", ["A"]), _Account("b", ["B"])]
+    allocator = EnrollmentAllocator(_scripted({"a": WON, "b": WON}, calls))
+
+    assert allocator.run({"A": 1, "B": 0}, accounts) == {"A": 1}
+    assert calls == ["a"]
+
+
+def test_in_flight_attempts_are_capped_at_seats_plus_extra():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def attempt(ua, course_id, cancel):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            if in_flight == 3:
+                release.set()
+        release.wait(timeout=1)
+        with lock:
+            in_flight -= 1
+        return LOST, None
+
+    accounts = [_Account(str(i), ["A"]) for i in range(8)]
+    EnrollmentAllocator(attempt, extra_attempts=1, max_workers=8).run({"A": 2}, accounts)
+
+    assert peak == 3
+
+
+def test_win_cancels_other_attempts_before_followup():
+    started = threading.Event()
+    observed = {}
+
+    def attempt(ua, course_id, cancel):
+        if ua.account == "winner":
+            started.wait(timeout=1)
+            # 後續動作執行時，其他嘗試應已收到取消
+            return WON, lambda: observed.setdefault("cancelled_before_followup", cancel.is_set())
+        started.set()
+        observed["loser_cancelled"] = cancel.wait(timeout=1)
+        return CANCELLED, None
+
+    accounts = [_Account("winner", ["A"], 1), _Account("loser", ["A"], 0)]
+    result = EnrollmentAllocator(attempt, extra_attempts=1).run({"A": 1}, accounts)
+
+    assert result == {"A": 1}
+    assert observed == {"loser_cancelled": True, "cancelled_before_followup": True}
+
+
+def test_attempt_errors_count_as_lost():
+    calls = []
+
+    def attempt(ua, course_id, cancel):
+        calls.append(ua.account)
+        if ua.account == "a":
+            raise RuntimeError("boom")
+        return WON, None
+
+    accounts = [_Account("a", ["A"]), _Account("b", ["A"])]
+    assert EnrollmentAllocator(attempt, extra_attempts=0).run({"A": 1}, accounts) == {"A": 1}
+    assert calls == ["a", "b"]
@@ -0,0 +1,39 @@
+import sqlite3
+
+from app.captcha_corpus import CaptchaCorpus
+
+
+def _stored_bytes(corpus: CaptchaCorpus) -> int:
+    with sqlite3.connect(corpus.path) as conn:
+        return conn.execute("SELECT COALESCE(SUM(LENGTH(image)), 0) FROM samples").fetchone()[0]
+
+
+def test_running_total_tracks_inserts_and_upgrades(tmp_path):
+    corpus = CaptchaCorpus(str(tmp_path / "corpus.sqlite3"), max_bytes=1000)
+
+    assert corpus.add(b"a" * 100, "1234", verified=False, source="login")
+    assert corpus.add(b"b" * 200, "5678", verified=True, source="login")
+    # 錯誤樣本升級為已驗證，大小不重複計算
+    assert corpus.add(b"a" * 100, "1234", verified=True, source="enroll")
+    assert not corpus.add(b"b" * 200, "0000", verified=False, source="enroll")
+
+    assert corpus._total_bytes == _stored_bytes(corpus) == 300
+
+
+def test_evicts_oldest_wrong_samples_first(tmp_path):
+    corpus = CaptchaCorpus(str(tmp_path / "corpus.sqlite3"), max_bytes=250)
+
+    corpus.add(b"a" * 100, "1111", verified=True, source="login")
+    corpus.add(b"b" * 100, "2222", verified=False, source="login")
+    corpus.add(b"c" * 100, "3333", verified=False, source="login")
+
+    assert [label for _, label in corpus.samples(verified=True)] == ["1111"]
+    assert [label for _, label in corpus.samples(verified=False)] == ["3333"]
+    assert corpus._total_bytes == _stored_bytes(corpus) == 200
+
+
+def test_total_is_loaded_from_existing_file(tmp_path):
+    path = str(tmp_path / "corpus.sqlite3")
+    CaptchaCorpus(path, max_bytes=1000).add(b"a" * 120, "1234", verified=True, source="login")
+
+    assert CaptchaCorpus(path, max_bytes=1000)._total_bytes == 120
@@ -0,0 +1,64 @@
+import pytest
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def _open_breaker(open_seconds: float = 0.0) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", min_calls=2, failure_rate=0.5, open_seconds=open_seconds)
+    for _ in range(2):
+        breaker.record(breaker.allow_request(), True, 0.0)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_on_error_rate_and_fails_fast():
+    breaker = _open_breaker(open_seconds=60)
+    with pytest.raises(CircuitOpenError):
+        breaker.allow_request()
+
+
+def test_single_probe_closes_breaker():
+    breaker = _open_breaker()
+    probe = breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow_request()
+
+    breaker.record(probe, False, 0.0)
+    assert breaker.state == CLOSED
+
+
+def test_stale_failure_during_probe_is_ignored():
+    breaker = CircuitBreaker("test", min_calls=2, failure_rate=0.5, open_seconds=0.0)
+    stale = breaker.allow_request()
+    for _ in range(2):
+        breaker.record(breaker.allow_request(), True, 0.0)
+    assert breaker.state == OPEN
+
+    probe = breaker.allow_request()
+    # 開啟前送出的請求在探測期間才失敗
+    breaker.record(stale, True, 0.0)
+    assert breaker.state == HALF_OPEN
+
+    breaker.record(probe, False, 0.0)
+    assert breaker.state == CLOSED
+
+
+def test_stale_success_does_not_close_breaker():
+    breaker = CircuitBreaker("test", min_calls=2, failure_rate=0.5, open_seconds=0.0)
+    stale = breaker.allow_request()
+    for _ in range(2):
+        breaker.record(breaker.allow_request(), True, 0.0)
+
+    probe = breaker.allow_request()
+    breaker.record(stale, False, 0.0)
+    assert breaker.state == HALF_OPEN
+
+    breaker.record(probe, True, 0.0)
+    assert breaker.state == OPEN
+
+
+def test_slow_call_counts_as_failure():
+    breaker = CircuitBreaker("test", min_calls=2, failure_rate=0.5, slow_call_seconds=1.0)
+    for _ in range(2):
+        breaker.record(breaker.allow_request(), False, 5.0)
+    assert breaker.state == OPEN
@@ -0,0 +1,74 @@
+import pytest
+import requests
+
+from app import captcha_corpus
+from app.circuit_breaker import CircuitOpenError
+from app.login_manager import LoginManager
+
+
+class _RejectingSession:
+    def get(self, url, **kwargs):
+        raise CircuitOpenError("SSO", 30)
+
+    def post(self, url, **kwargs):
+        raise CircuitOpenError("SSO", 30)
+
+
+def test_login_propagates_open_breaker():
+    manager = LoginManager(_RejectingSession(), captcha_solver=None)
+
+    # 斷路器開啟不是登入失敗，交由呼叫端停止加選，不消耗重試次數
+    with pytest.raises(CircuitOpenError):
+        manager.login("B11234567", "password")
+
+
+class _Response:
+    def __init__(self, text: str, status_code: int = 200):
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}")
+
+
+class _LoginSession:
+    # 登入前的狀態查詢回傳 false，送出登入後的查詢結果由 verify_after 決定
+    def __init__(self, verify_after):
+        self.verify_after = verify_after
+        self.posted = False
+
+    def get(self, url, **kwargs):
+        if url == LoginManager.VERIFY_URL:
+            if not self.posted:
+                return _Response("false")
+            if isinstance(self.verify_after, Exception):
+                raise self.verify_after
+            return self.verify_after
+        if url == LoginManager.CAPTCHA_URL:
+            return _Response('"aW1hZ2U="')
+        return _Response('<input name="__RequestVerificationToken" value="token">')
+
+    def post(self, url, **kwargs):
+        self.posted = True
+        return _Response("")
+
+
+class _Solver:
+    def solve_base64(self, b64):
+        return "1234"
+
+
+@pytest.mark.parametrize("verify_after, expected", [
+    (_Response("true"), [True]),
+    (_Response("false"), [False]),
+    (_Response("", status_code=503), []),
+    (requests.Timeout("timed out"), []),
+])
+def test_login_labels_captcha_only_on_known_result(monkeypatch, verify_after, expected):
+    recorded = []
+    monkeypatch.setattr(captcha_corpus, "record", lambda b64, label, verified, source: recorded.append(verified))
+
+    LoginManager(_LoginSession(verify_after), _Solver()).login("B11234567", "password", max_retries=1)
+
+    assert recorded == expected
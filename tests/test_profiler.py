@@ -0,0 +1,66 @@
+import json
+
+import requests
+from requests.adapters import BaseAdapter
+
+from app.profiler import RecordingAdapter, StackSampler, _request_key
+
+
+def _prepared(data: dict) -> requests.PreparedRequest:
+    return requests.Request("POST", "https://webapp.yuntech.edu.tw/YunTechSSO/Account/Login", data=data).prepare()
+
+
+class _FakeAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = b"ok"
+        resp.headers["Content-Type"] = "text/html"
+        resp.headers["Set-Cookie"] = ".AspNet.ApplicationCookie=secret; path=/"
+        resp.request = request
+        return resp
+
+    def close(self):
+        pass
+
+
+def test_request_key_hides_credentials():
+    key = _request_key(_prepared({"pLoginName": "B11234567", "pLoginPassword": "hunter2", "pSecretString": "1234"}))
+
+    assert "hunter2" not in key
+    assert "B11234567" not in key
+    assert "pLoginPassword" not in key
+    # 不同帳號的登入請求仍可區分
+    assert key != _request_key(_prepared({"pLoginName": "B11234568", "pLoginPassword": "hunter2"}))
+    assert key == _request_key(_prepared({"pLoginName": "B11234567", "pLoginPassword": "other", "pSecretString": "9999"}))
+
+
+def test_recording_drops_cookies(tmp_path):
+    adapter = RecordingAdapter(_FakeAdapter())
+    request = _prepared({"pLoginName": "B11234567"})
+    request.headers["Cookie"] = "session=abc"
+    adapter.send(request)
+
+    path = tmp_path / "recording.json"
+    adapter.save(str(path))
+    (entry,) = next(iter(json.loads(path.read_text(encoding="utf-8")).values()))
+
+    assert "Content-Type" in entry["headers"]
+    assert not any(name.lower() in ("set-cookie", "cookie") for name in entry["headers"])
+
+
+def test_hot_functions_skip_idle_threads():
+    sampler = StackSampler()
+    worker = ("_bootstrap (threading.py:1016)", "_worker (thread.py:69)")
+    sampler.stacks[worker + ("get_course_info (scraper.py:20)", "parse (bs4.py:10)")] += 3
+    sampler.stacks[worker + ("solve_base64 (captcha_solver.py:59)",)] += 1
+    # 等待工作的 worker 與等待結果的 job() 執行緒
+    sampler.stacks[worker] += 50
+    sampler.stacks[("job (main.py:220)", "wait (threading.py:629)")] += 50
+
+    hot = {h["function"]: h for h in sampler.hot_functions()}
+
+    assert hot["parse (bs4.py:10)"]["self_pct"] == 75.0
+    assert hot["solve_base64 (captcha_solver.py:59)"]["self_pct"] == 25.0
+    assert hot["_worker (thread.py:69)"]["total_pct"] == 100.0
+    assert "job (main.py:220)" not in hot
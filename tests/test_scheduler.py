@@ -0,0 +1,81 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app import scheduler
+from app.scheduler import SCHEDULE_TZ, PollingProfile, PollingSchedule, TimeWindow, load_schedule
+
+DEFAULT = PollingProfile("default", 300, 2)
+BURST = PollingProfile("burst", 5, 16, warm_sessions=True)
+
+
+def _at(text: str) -> datetime:
+    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S").replace(tzinfo=SCHEDULE_TZ)
+
+
+def test_daily_window():
+    schedule = PollingSchedule(DEFAULT, [TimeWindow("12:00", "12:30", BURST)])
+
+    assert schedule.current_profile(_at("2026-02-16 11:59:59")) is DEFAULT
+    assert schedule.current_profile(_at("2026-02-16 12:00:00")) is BURST
+    assert schedule.current_profile(_at("2026-02-17 12:29:59")) is BURST
+    assert schedule.current_profile(_at("2026-02-17 12:30:00")) is DEFAULT
+
+
+def test_dated_window():
+    schedule = PollingSchedule(DEFAULT, [TimeWindow("2026-02-16 09:00", "2026-02-16 12:00", BURST)])
+
+    assert schedule.current_profile(_at("2026-02-16 08:59:59")) is DEFAULT
+    assert schedule.current_profile(_at("2026-02-16 09:00:00")) is BURST
+    assert schedule.current_profile(_at("2026-02-16 12:00:00")) is DEFAULT
+    # 單次時段不會在隔天重複
+    assert schedule.current_profile(_at("2026-02-17 10:00:00")) is DEFAULT
+
+
+def test_window_past_midnight():
+    schedule = PollingSchedule(DEFAULT, [TimeWindow("23:00", "01:00", BURST)])
+
+    assert schedule.current_profile(_at("2026-02-16 22:59:59")) is DEFAULT
+    assert schedule.current_profile(_at("2026-02-16 23:30:00")) is BURST
+    assert schedule.current_profile(_at("2026-02-17 00:59:59")) is BURST
+    assert schedule.current_profile(_at("2026-02-17 01:00:00")) is DEFAULT
+
+
+def test_wakes_up_early_for_next_window():
+    schedule = PollingSchedule(DEFAULT, [
+        TimeWindow("2026-02-16 09:00", "2026-02-16 12:00", BURST),
+        TimeWindow("12:00", "12:30", BURST),
+    ])
+
+    assert schedule.seconds_until_next_run(_at("2026-02-16 08:58:20")) == 100
+    assert schedule.seconds_until_next_run(_at("2026-02-16 10:00:00")) == 5
+    # 沒有即將開始的時段時睡滿 default 的 interval
+    assert schedule.seconds_until_next_run(_at("2026-02-16 13:00:00")) == 300
+
+
+def _write_schedule(tmp_path, monkeypatch, config: dict):
+    path = tmp_path / "schedule.json"
+    path.write_text(json.dumps(config), encoding="utf-8")
+    monkeypatch.setattr(scheduler, "SCHEDULE_JSON_PATH", str(path))
+
+
+def test_load_schedule_inherits_default(tmp_path, monkeypatch):
+    _write_schedule(tmp_path, monkeypatch, {
+        "default": {"interval": 120},
+        "windows": [{"name": "noon", "start": "12:00", "end": "12:30", "interval": 10}],
+    })
+
+    schedule = load_schedule(30, 8)
+
+    assert (schedule.default.interval, schedule.default.max_concurrency) == (120, 8)
+    window = schedule.windows[0].profile
+    assert (window.name, window.interval, window.max_concurrency) == ("noon", 10, 8)
+
+
+@pytest.mark.parametrize("profile", [{"interval": 0}, {"interval": -5}, {"max_concurrency": 0}])
+def test_load_schedule_rejects_unsafe_values(tmp_path, monkeypatch, profile):
+    _write_schedule(tmp_path, monkeypatch, {"windows": [{"start": "12:00", "end": "12:30", **profile}]})
+
+    with pytest.raises(ValueError):
+        load_schedule(30, 8)
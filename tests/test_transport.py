@@ -0,0 +1,74 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from app import transport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.0：每次回應後關閉連線，下一個請求一定會建立新連線
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _lookups(monkeypatch) -> list[str]:
+    hosts = []
+    original = socket.getaddrinfo
+
+    def counting(host, *args, **kwargs):
+        hosts.append(host)
+        return original(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting)
+    return hosts
+
+
+def _get_three_times(port: int):
+    session = requests.Session()
+    session.mount("http://", transport._build_adapter())
+    for _ in range(3):
+        assert session.get(f"http://localhost:{port}/", timeout=5).text == "ok"
+
+
+def test_import_does_not_patch_socket():
+    assert socket.getaddrinfo.__module__ == "socket"
+
+
+def test_cached_host_is_resolved_once(server, monkeypatch):
+    monkeypatch.setattr(transport, "DNS_CACHE_HOSTS", {"localhost"})
+    monkeypatch.setattr(transport, "_dns_cache", {})
+    hosts = _lookups(monkeypatch)
+
+    _get_three_times(server)
+
+    assert hosts.count("localhost") == 1
+
+
+def test_other_hosts_are_not_cached(server, monkeypatch):
+    monkeypatch.setattr(transport, "DNS_CACHE_HOSTS", {"webapp.yuntech.edu.tw"})
+    monkeypatch.setattr(transport, "_dns_cache", {})
+    hosts = _lookups(monkeypatch)
+
+    _get_three_times(server)
+
+    assert hosts.count("localhost") == 3
+    assert transport._dns_cache == {}